@@ -13,7 +13,7 @@ Customization points:
   - Adjust PROJECT_ROOT, SPEC_DIR, source directories, etc. to match your project
   - Add or modify _count_*() functions to match your project's component structure
   - _count_table_rows() is generic and can be reused in most projects as-is
-  - Adjust regex patterns in _count_spec_*() functions to match your spec headings
+  - Adjust the _SECTION_*/_STOP_* heading anchors to match your spec headings
   - If there is no IaC, omit the Terraform-related checks
 
 Usage:
@@ -22,9 +22,12 @@ Usage:
 
 from __future__ import annotations
 
+import functools
+import os
 import re
 import sys
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from pathlib import Path
 
 # ============================================================================
@@ -40,6 +43,9 @@ OVERVIEW = SPEC_DIR / "01_overview.md"
 BUSINESS = SPEC_DIR / "02_business_spec.md"
 TECHNICAL = SPEC_DIR / "03_technical_spec.md"
 
+DYNAMODB_TF = TERRAFORM_DIR / "dynamodb.tf"
+API_GATEWAY_TF = TERRAFORM_DIR / "api_gateway.tf"
+
 IGNORED_FILES = {"__init__.py"}
 IGNORED_DIRS = {"__pycache__", "__init__.py"}
 
@@ -57,30 +63,32 @@ def _read(path: Path) -> str:
 
 def _count_lambda_dirs() -> list[str]:
     """Get Lambda function directory names under lambda_functions/."""
-    return sorted(
-        d.name
-        for d in LAMBDA_DIR.iterdir()
-        if d.is_dir() and d.name not in IGNORED_DIRS
-    )
+    with os.scandir(LAMBDA_DIR) as it:
+        return sorted(e.name for e in it if e.is_dir() and e.name not in IGNORED_DIRS)
 
 
 def _count_layer_modules() -> list[str]:
     """Get shared module names under lambda_layer/python/."""
-    return sorted(
-        f.name for f in LAYER_DIR.glob("*.py") if f.name not in IGNORED_FILES
-    )
+    with os.scandir(LAYER_DIR) as it:
+        return sorted(
+            e.name
+            for e in it
+            if e.name.endswith(".py") and e.name not in IGNORED_FILES and e.is_file()
+        )
+
 
+_TF_DYNAMODB_RE = re.compile(r'resource\s+"aws_dynamodb_table"\s+"(\w+)"')
+_TF_API_ROUTE_RE = re.compile(r'resource\s+"aws_apigatewayv2_route"\s+"(\w+)"')
 
-def _count_dynamodb_tables_in_terraform() -> list[str]:
-    """Get aws_dynamodb_table resource names from terraform/dynamodb.tf."""
-    content = _read(TERRAFORM_DIR / "dynamodb.tf")
-    return re.findall(r'resource\s+"aws_dynamodb_table"\s+"(\w+)"', content)
 
+def _count_dynamodb_tables_in_terraform(content: str) -> list[str]:
+    """Get aws_dynamodb_table resource names from terraform/dynamodb.tf content."""
+    return _TF_DYNAMODB_RE.findall(content)
 
-def _count_api_routes_in_terraform() -> list[str]:
-    """Get aws_apigatewayv2_route resource names from terraform/api_gateway.tf."""
-    content = _read(TERRAFORM_DIR / "api_gateway.tf")
-    return re.findall(r'resource\s+"aws_apigatewayv2_route"\s+"(\w+)"', content)
+
+def _count_api_routes_in_terraform(content: str) -> list[str]:
+    """Get aws_apigatewayv2_route resource names from terraform/api_gateway.tf content."""
+    return _TF_API_ROUTE_RE.findall(content)
 
 
 # ---------------------------------------------------------------------------
@@ -89,24 +97,31 @@ def _count_api_routes_in_terraform() -> list[str]:
 # This function can be reused in most projects as-is
 
 
-def _count_table_rows(text: str, section_pattern: str, stop_pattern: str) -> int:
+_SEP_RE = re.compile(r"^\|[\s\-|]+\|$")
+
+
+def _count_table_rows(text: str, section_heading: str, stop_heading: str) -> int:
     """Count data rows in a markdown table within a spec document.
 
-    Detects section start with section_pattern and end with stop_pattern.
+    The section runs from the line containing section_heading up to the next
+    occurrence of stop_heading; both are located with str.find, so only that
+    slice of the document is split into lines.
     Returns the number of data rows excluding the table header row (|---|).
     """
-    in_section = False
+    start = text.find(section_heading)
+    if start == -1:
+        return 0
+    start = text.find("\n", start)  # Skip the heading line itself
+    if start == -1:
+        return 0
+    end = text.find(stop_heading, start)
+    if end == -1:
+        end = len(text)
     in_table = False
     count = 0
-    for line in text.splitlines():
-        if not in_section:
-            if re.search(section_pattern, line):
-                in_section = True
-            continue
-        if re.search(stop_pattern, line):
-            break
+    for line in text[start:end].splitlines():
         stripped = line.strip()
-        if stripped.startswith("|") and not re.match(r"^\|[\s\-|]+\|$", stripped):
+        if stripped.startswith("|") and not _SEP_RE.match(stripped):
             if in_table:
                 count += 1
             else:
@@ -117,41 +132,34 @@ def _count_table_rows(text: str, section_pattern: str, stop_pattern: str) -> int
 
 
 # ---------------------------------------------------------------------------
-# Customization point: Regex patterns matched to spec section headings
+# Customization point: Literal heading anchors matched to spec section headings
 # ---------------------------------------------------------------------------
+_SECTION_LAMBDA_API = "#### API Endpoint Integration"
+_SECTION_LAMBDA_BATCH = "#### Monthly Rank Batch"
+_SECTION_LAYER = "### 3.2 Shared Layer Modules"
+_SECTION_DYNAMODB = "### 3.3 DynamoDB"
+_STOP_LAMBDA = "### 3.2"
+_STOP_LAYER = "### 3.3"
+_STOP_DYNAMODB = "### 3.4"
 
 
 def _count_spec_lambda_functions(overview_text: str) -> int:
     """Count rows in the Lambda functions table in 01_overview.md (API + batch)."""
     api_count = _count_table_rows(
-        overview_text,
-        r"####\s+API\s+Endpoint\s+Integration",
-        r"####\s+Monthly\s+Rank\s+Batch",
-    )
-    batch_count = _count_table_rows(
-        overview_text,
-        r"####\s+Monthly\s+Rank\s+Batch",
-        r"###\s+3\.2",
+        overview_text, _SECTION_LAMBDA_API, _SECTION_LAMBDA_BATCH
     )
+    batch_count = _count_table_rows(overview_text, _SECTION_LAMBDA_BATCH, _STOP_LAMBDA)
     return api_count + batch_count
 
 
 def _count_spec_layer_modules(overview_text: str) -> int:
     """Count rows in the shared layer modules table in 01_overview.md."""
-    return _count_table_rows(
-        overview_text,
-        r"###\s+3\.2\s+Shared\s+Layer\s+Modules",
-        r"###\s+3\.3",
-    )
+    return _count_table_rows(overview_text, _SECTION_LAYER, _STOP_LAYER)
 
 
 def _count_spec_dynamodb_tables(overview_text: str) -> int:
     """Count rows in the DynamoDB tables table in 01_overview.md."""
-    return _count_table_rows(
-        overview_text,
-        r"###\s+3\.3\s+DynamoDB",
-        r"###\s+3\.4",
-    )
+    return _count_table_rows(overview_text, _SECTION_DYNAMODB, _STOP_DYNAMODB)
 
 
 # ---------------------------------------------------------------------------
@@ -159,13 +167,32 @@ def _count_spec_dynamodb_tables(overview_text: str) -> int:
 # ---------------------------------------------------------------------------
 
 
+_SPEC_TOKEN_RE = re.compile(r"[\w-]+")
+
+
+@functools.lru_cache(maxsize=4)
+def _spec_tokens(combined: str) -> frozenset[str]:
+    """Split spec text into the set of identifier-like tokens it contains.
+
+    Memoized, so repeated checks against the same spec texts tokenize once.
+    """
+    return frozenset(_SPEC_TOKEN_RE.findall(combined))
+
+
 def _find_missing_in_spec(names: list[str], *spec_texts: str) -> list[str]:
-    """Check whether file/directory names appear in any of the spec texts."""
+    """Check whether file/directory names appear in any of the spec texts.
+
+    Names that occur as a whole token are found with a set lookup. Any other
+    name (a fragment of a longer identifier, or one that is actually missing)
+    falls back to a substring search, so each missing name still costs one
+    scan of the combined text.
+    """
     combined = "\n".join(spec_texts)
+    tokens = _spec_tokens(combined)
     missing = []
     for name in names:
-        search_name = name.replace(".py", "")
-        if search_name not in combined:
+        search_name = name[:-3] if name.endswith(".py") else name
+        if search_name not in tokens and search_name not in combined:
             missing.append(name)
     return missing
 
@@ -175,11 +202,23 @@ def _find_missing_in_spec(names: list[str], *spec_texts: str) -> list[str]:
 # ---------------------------------------------------------------------------
 
 
-def _parse_last_verified_date(spec_text: str) -> datetime | None:
-    """Parse 'Last verified: YYYY-MM-DD' from the end of a spec document."""
-    match = re.search(r"Last verified:\s*(\d{4}-\d{2}-\d{2})", spec_text)
+_LAST_VERIFIED_RE = re.compile(r"Last verified:\s*(\d{4}-\d{2}-\d{2})")
+_LAST_VERIFIED_TAIL_BYTES = 4096
+
+
+def _parse_last_verified_date(spec_file: Path) -> int | None:
+    """Parse 'Last verified: YYYY-MM-DD' from the end of a spec document.
+
+    The tag lives in the footer, so only the last few KiB of the file are read.
+    Returns the date as a proleptic Gregorian ordinal (date.toordinal()).
+    """
+    with spec_file.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - _LAST_VERIFIED_TAIL_BYTES))
+        tail = f.read().decode("utf-8", errors="replace")
+    match = _LAST_VERIFIED_RE.search(tail)
     if match:
-        return datetime.strptime(match.group(1), "%Y-%m-%d")
+        return date(*map(int, match.group(1).split("-"))).toordinal()
     return None
 
 
@@ -189,100 +228,85 @@ def _parse_last_verified_date(spec_text: str) -> datetime | None:
 
 
 def main() -> int:
-    print("=== Spec Document Consistency Check ===\n")
+    # Output is collected and written once at the end (one write to a CI pipe)
+    lines: list[str] = ["=== Spec Document Consistency Check ===\n"]
 
     warnings = 0
 
-    overview_text = _read(OVERVIEW)
-    technical_text = _read(TECHNICAL)
+    # The reads are independent, so overlap them (helps on cold caches and
+    # network filesystems)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        overview_text, technical_text, dynamodb_tf, api_gateway_tf = executor.map(
+            _read, [OVERVIEW, TECHNICAL, DYNAMODB_TF, API_GATEWAY_TF]
+        )
 
     # --- 1. Component count matching ---
     lambda_dirs = _count_lambda_dirs()
     layer_modules = _count_layer_modules()
-    dynamodb_tables = _count_dynamodb_tables_in_terraform()
-    api_routes = _count_api_routes_in_terraform()
+    dynamodb_tables = _count_dynamodb_tables_in_terraform(dynamodb_tf)
+    api_routes = _count_api_routes_in_terraform(api_gateway_tf)
 
     spec_lambda_count = _count_spec_lambda_functions(overview_text)
     spec_layer_count = _count_spec_layer_modules(overview_text)
     spec_dynamodb_count = _count_spec_dynamodb_tables(overview_text)
 
-    # Lambda functions
-    code_lambda_count = len(lambda_dirs)
-    if code_lambda_count == spec_lambda_count:
-        print(f"[OK] Lambda functions: {code_lambda_count} (code) = {spec_lambda_count} (spec)")
-    else:
-        print(
-            f"[WARN] Lambda functions: {code_lambda_count} (code) != {spec_lambda_count} (spec) <- needs review"
-        )
-        warnings += 1
-
-    # Shared modules
-    code_layer_count = len(layer_modules)
-    if code_layer_count == spec_layer_count:
-        print(f"[OK] Shared modules: {code_layer_count} (code) = {spec_layer_count} (spec)")
-    else:
-        print(
-            f"[WARN] Shared modules: {code_layer_count} (code) != {spec_layer_count} (spec) <- needs review"
-        )
-        warnings += 1
-
-    # DynamoDB tables
-    code_dynamodb_count = len(dynamodb_tables)
-    if code_dynamodb_count == spec_dynamodb_count:
-        print(f"[OK] DynamoDB tables: {code_dynamodb_count} (code) = {spec_dynamodb_count} (spec)")
-    else:
-        print(
-            f"[WARN] DynamoDB tables: {code_dynamodb_count} (code) != {spec_dynamodb_count} (spec) <- needs review"
-        )
-        warnings += 1
-
-    # API routes
-    code_api_count = len(api_routes)
     api_sections = re.findall(r"###\s+1\.\d+\s+(?:POST|GET)\s+/", technical_text)
     spec_api_count = len(api_sections)
-    if code_api_count == spec_api_count:
-        print(f"[OK] API routes: {code_api_count} (code) = {spec_api_count} (spec)")
-    else:
-        print(
-            f"[WARN] API routes: {code_api_count} (code) != {spec_api_count} (spec) <- needs review"
-        )
-        warnings += 1
+
+    checks = [
+        ("Lambda functions", len(lambda_dirs), spec_lambda_count),
+        ("Shared modules", len(layer_modules), spec_layer_count),
+        ("DynamoDB tables", len(dynamodb_tables), spec_dynamodb_count),
+        ("API routes", len(api_routes), spec_api_count),
+    ]
+    for label, code_count, spec_count in checks:
+        if code_count == spec_count:
+            lines.append(f"[OK] {label}: {code_count} (code) = {spec_count} (spec)")
+        else:
+            lines.append(
+                f"[WARN] {label}: {code_count} (code) != {spec_count} (spec) <- needs review"
+            )
+    warnings += sum(1 for _, code_count, spec_count in checks if code_count != spec_count)
 
     # --- 2. File name coverage check ---
     missing_lambdas = _find_missing_in_spec(lambda_dirs, technical_text, overview_text)
     missing_modules = _find_missing_in_spec(layer_modules, technical_text, overview_text)
 
     if missing_lambdas or missing_modules:
-        print("\nFiles not listed in spec:")
+        lines.append("\nFiles not listed in spec:")
         for name in missing_lambdas:
-            print(f"  - lambda_functions/{name}/ -> not listed in 03_technical_spec.md")
+            lines.append(f"  - lambda_functions/{name}/ -> not listed in 03_technical_spec.md")
             warnings += 1
         for name in missing_modules:
-            print(f"  - lambda_layer/python/{name} -> not listed in 03_technical_spec.md")
+            lines.append(f"  - lambda_layer/python/{name} -> not listed in 03_technical_spec.md")
             warnings += 1
 
     # --- 3. Spec metadata freshness check ---
-    today = datetime.now()
-    threshold = timedelta(days=30)
+    today = date.today().toordinal()
+    threshold_days = 30
 
     for spec_file in [OVERVIEW, BUSINESS, TECHNICAL]:
-        spec_text = _read(spec_file)
-        last_verified = _parse_last_verified_date(spec_text)
+        last_verified = _parse_last_verified_date(spec_file)
         if last_verified is None:
-            print(f"\n[WARN] Last verified date not set: {spec_file.name}")
+            lines.append(f"\n[WARN] Last verified date not set: {spec_file.name}")
             warnings += 1
-        elif today - last_verified > threshold:
-            print(
-                f"[WARN] Last verified date is over 30 days old: {spec_file.name} (last: {last_verified.strftime('%Y-%m-%d')})"
+        elif today - last_verified >= threshold_days:
+            lines.append(
+                f"[WARN] Last verified date is over 30 days old: {spec_file.name} (last: {date.fromordinal(last_verified).isoformat()})"
             )
             warnings += 1
 
     # --- Result summary ---
-    print()
+    lines.append("")
     if warnings == 0:
-        print("Result: All OK - spec documents and code are consistent")
+        lines.append("Result: All OK - spec documents and code are consistent")
     else:
-        print(f"Result: {warnings} warning(s) found - consider updating spec documents")
+        lines.append(
+            f"Result: {warnings} warning(s) found - consider updating spec documents"
+        )
+
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
     return 1 if warnings > 0 else 0
 
@@ -10,58 +10,147 @@ Usage:
 
 from __future__ import annotations
 
+import fnmatch
+import functools
 import json
+import os
+import re
 import sys
 from pathlib import Path
 
 
+IGNORE_DIRS = frozenset({
+    ".git", "node_modules", "__pycache__", ".venv", "venv",
+    ".tox", ".mypy_cache", ".pytest_cache", "dist", "build",
+    ".next", ".nuxt", "target", "vendor", ".terraform",
+    "coverage", ".coverage", "htmlcov", "egg-info",
+})
+
+CLAUDE_MD_PREVIEW_CHARS = 3000
+
+# Bounds for heading extraction, so that huge generated docs stay cheap
+MAX_HEADINGS = 500
+MAX_HEADING_SCAN_BYTES = 1_000_000
+
+_LANGUAGE_TAG_RE = re.compile(r"<language>(.*?)</language>")
+
+# test_*.py, *_test.py, *.test.js, *.test.ts, *.spec.js, *.spec.ts,
+# *_test.go, *Test.java
+_TEST_FILE_RE = re.compile(
+    r"test_.*\.py|.*_test\.(?:py|go)|.*\.(?:test|spec)\.[jt]s|.*Test\.java"
+)
+
+
+def _scan_dir(d: Path) -> dict[str, os.DirEntry]:
+    """List directory entries by name; DirEntry caches the type from the scan."""
+    try:
+        with os.scandir(d) as it:
+            return {e.name: e for e in it}
+    except OSError:
+        return {}
+
+
+def _has_case_variant(top: dict[str, os.DirEntry], name: str) -> bool:
+    lowered = name.lower()
+    return any(n.lower() == lowered for n in top)
+
+
+def _is_file_in(top: dict[str, os.DirEntry], d: Path, name: str) -> bool:
+    """Check whether name is a file in d, given the _scan_dir listing of d.
+
+    Exact names are answered from the listing. A name that only matches with
+    different case is stat'ed, so case-insensitive filesystems (macOS and
+    Windows defaults) still find e.g. "makefile" for "Makefile".
+    """
+    entry = top.get(name)
+    if entry is not None:
+        return entry.is_file()
+    return _has_case_variant(top, name) and (d / name).is_file()
+
+
+def _is_dir_in(top: dict[str, os.DirEntry], d: Path, name: str) -> bool:
+    """Directory counterpart of _is_file_in."""
+    entry = top.get(name)
+    if entry is not None:
+        return entry.is_dir()
+    return _has_case_variant(top, name) and (d / name).is_dir()
+
+
+@functools.lru_cache(maxsize=None)
+def _walk_files(root: Path) -> list[tuple[str, list[str]]]:
+    """Walk the project tree once, pruning ignored and hidden directories.
+
+    Returns (directory relative to root, file names) pairs. The result is
+    cached so that every discovery step shares a single traversal.
+    """
+    walked = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Prune in place so ignored directories are never descended into
+        dirnames[:] = [
+            d for d in dirnames if d not in IGNORE_DIRS and not d.startswith(".")
+        ]
+        walked.append((os.path.relpath(dirpath, root), filenames))
+    return walked
+
+
 def discover_spec_files(root: Path) -> list[dict]:
     """Detect specification document candidate files."""
-    patterns = [
-        "docs/**/*.md",
-        "spec/**/*.md",
-        "specification/**/*.md",
-        "specifications/**/*.md",
-        "doc/**/*.md",
-        "documents/**/*.md",
-        "wiki/**/*.md",
-        "design/**/*.md",
-        "*.md",  # Root-level md files (README, etc.)
+    spec_dirs = [
+        "docs", "spec", "specification", "specifications",
+        "doc", "documents", "wiki", "design",
     ]
+    top = _scan_dir(root)
+    found: dict[str, Path] = {}
+    # Only descend into spec directories that actually exist at the root
+    for dir_name in spec_dirs:
+        if _is_dir_in(top, root, dir_name):
+            for f in sorted((root / dir_name).rglob("*.md")):
+                found.setdefault(str(f.relative_to(root)), f)
+    # Root-level md files (README, etc.)
+    for name in sorted(top):
+        if name.endswith(".md") and top[name].is_file():
+            found.setdefault(name, root / name)
+
     results = []
-    seen = set()
-    for pattern in patterns:
-        for f in sorted(root.glob(pattern)):
-            if f.name.startswith(".") or "__pycache__" in str(f):
-                continue
-            rel = str(f.relative_to(root))
-            if rel in seen:
-                continue
-            seen.add(rel)
-            # Parse heading structure
+    for rel, f in found.items():
+        if f.name.startswith(".") or "__pycache__" in rel:
+            continue
+        size = f.stat().st_size
+        # Parse heading structure
+        if size > MAX_HEADING_SCAN_BYTES:
+            headings = [{"level": 0, "title": "... (file too large)"}]
+        else:
             headings = _extract_headings(f)
-            results.append({
-                "path": rel,
-                "headings": headings,
-                "size_bytes": f.stat().st_size,
-            })
+        results.append({
+            "path": rel,
+            "headings": headings,
+            "size_bytes": size,
+        })
     return results
 
 
 def _extract_headings(md_file: Path) -> list[dict]:
-    """Extract heading structure from Markdown file."""
+    """Extract ATX heading structure (# to ######) from Markdown file."""
     headings = []
     try:
-        text = md_file.read_text(encoding="utf-8")
+        with md_file.open(encoding="utf-8") as f:
+            for line in f:
+                # lstrip/startswith return without copying for non-heading lines
+                stripped = line.lstrip(" \t")
+                if not stripped.startswith("#"):
+                    continue
+                rest = stripped.lstrip("#")
+                level = len(stripped) - len(rest)
+                if level > 6 or rest[:1] not in (" ", "\t"):
+                    continue
+                title = rest.strip()
+                if title:
+                    if len(headings) >= MAX_HEADINGS:
+                        headings.append({"level": 0, "title": "... (truncated)"})
+                        break
+                    headings.append({"level": level, "title": title})
     except (UnicodeDecodeError, OSError):
-        return headings
-    for line in text.splitlines():
-        stripped = line.strip()
-        if stripped.startswith("#"):
-            level = len(stripped) - len(stripped.lstrip("#"))
-            title = stripped.lstrip("#").strip()
-            if title:
-                headings.append({"level": level, "title": title})
+        return []
     return headings
 
 
@@ -82,65 +171,49 @@ def discover_source_code(root: Path) -> dict:
         ".swift": "Swift",
         ".kt": "Kotlin",
     }
-    ignore_dirs = {
-        ".git", "node_modules", "__pycache__", ".venv", "venv",
-        ".tox", ".mypy_cache", ".pytest_cache", "dist", "build",
-        ".next", ".nuxt", "target", "vendor", ".terraform",
-        "coverage", ".coverage", "htmlcov", "egg-info",
-    }
-
-    lang_counts: dict[str, int] = {}
-    source_dirs: list[str] = []
-    entry_points: list[str] = []
-    shared_modules: list[str] = []
-
-    # Scan top-level directories
-    for d in sorted(root.iterdir()):
-        if not d.is_dir() or d.name.startswith(".") or d.name in ignore_dirs:
-            continue
-        # Check if directory contains source code
-        has_source = False
-        for ext in language_extensions:
-            if list(d.rglob(f"*{ext}")):
-                has_source = True
-                break
-        if has_source:
-            source_dirs.append(d.name)
-
-    # Count files by language (top 3 levels only, for performance)
-    for f in root.rglob("*"):
-        if any(part in ignore_dirs for part in f.parts):
-            continue
-        if f.is_file() and f.suffix in language_extensions:
-            lang = language_extensions[f.suffix]
-            lang_counts[lang] = lang_counts.get(lang, 0) + 1
-
-    # Entry point candidates
-    entry_point_patterns = [
+    entry_point_names = frozenset({
         "main.py", "app.py", "index.py", "handler.py", "wsgi.py",
         "index.js", "index.ts", "app.js", "app.ts", "server.js", "server.ts",
         "main.go", "main.rs", "Main.java", "Program.cs",
         "manage.py", "setup.py",
-    ]
-    for pattern in entry_point_patterns:
-        for f in root.rglob(pattern):
-            if any(part in ignore_dirs for part in f.parts):
-                continue
-            entry_points.append(str(f.relative_to(root)))
-
+    })
     # Shared module candidates (lib/, shared/, common/, utils/, layer/, etc.)
-    shared_patterns = [
+    shared_names = frozenset({
         "lib", "shared", "common", "utils", "helpers", "core",
         "lambda_layer", "layer", "packages", "internal",
-    ]
-    for name in shared_patterns:
-        d = root / name
-        if d.is_dir():
-            for f in d.rglob("*"):
-                if f.is_file() and f.suffix in language_extensions:
-                    if any(part in ignore_dirs for part in f.parts):
-                        continue
-                    shared_modules.append(str(f.relative_to(root)))
+    })
+
+    lang_counts: dict[str, int] = {}
+    source_dirs: set[str] = set()
+    entry_points: list[str] = []
+    shared_modules: list[str] = []
+
+    # Map each shared top-level directory as listed on disk to its canonical
+    # name, so "Core/" on a case-insensitive filesystem is reported as "core/"
+    top_entries = _scan_dir(root)
+    shared_dirs: dict[str, str] = {}
+    for name in shared_names:
+        if _is_dir_in(top_entries, root, name):
+            lowered = name.lower()
+            listed = name if name in top_entries else next(
+                n for n in top_entries if n.lower() == lowered
+            )
+            shared_dirs[listed] = name
+
+    for rel_dir, filenames in _walk_files(root):
+        top = None if rel_dir == "." else rel_dir.split(os.sep, 1)[0]
+        for filename in filenames:
+            rel = filename if top is None else os.path.join(rel_dir, filename)
+            if filename in entry_point_names:
+                entry_points.append(rel)
+            lang = language_extensions.get(os.path.splitext(filename)[1])
+            if lang is None:
+                continue
+            lang_counts[lang] = lang_counts.get(lang, 0) + 1
+            if top is not None:
+                source_dirs.add(top)
+                if top in shared_dirs:
+                    shared_modules.append(shared_dirs[top] + rel[len(top):])
 
     # Determine primary language
     primary_language = None
@@ -169,13 +242,16 @@ def discover_iac(root: Path) -> list[dict]:
     ]
     results = []
     seen_dirs = set()
+    top = _scan_dir(root)
 
     # Directory-based detection
     for dir_name, iac_type, pattern in iac_indicators:
-        d = root / dir_name
-        if d.is_dir() and dir_name not in seen_dirs:
+        if dir_name not in seen_dirs and _is_dir_in(top, root, dir_name):
             seen_dirs.add(dir_name)
-            files = sorted(str(f.relative_to(root)) for f in d.glob(pattern) if f.is_file())
+            names = [e.name for e in _scan_dir(root / dir_name).values() if e.is_file()]
+            files = sorted(
+                os.path.join(dir_name, name) for name in fnmatch.filter(names, pattern)
+            )
             results.append({
                 "type": iac_type,
                 "directory": dir_name,
@@ -194,8 +270,7 @@ def discover_iac(root: Path) -> list[dict]:
         ("samconfig.toml", "SAM"),
     ]
     for filename, iac_type in single_file_indicators:
-        f = root / filename
-        if f.is_file():
+        if _is_file_in(top, root, filename):
             results.append({
                 "type": iac_type,
                 "directory": ".",
@@ -229,9 +304,9 @@ def discover_build_system(root: Path) -> list[dict]:
         ("Taskfile.yml", "Task"),
     ]
     results = []
+    top = _scan_dir(root)
     for filename, system_type in indicators:
-        f = root / filename
-        if f.is_file():
+        if _is_file_in(top, root, filename):
             results.append({
                 "type": system_type,
                 "file": filename,
@@ -242,23 +317,23 @@ def discover_build_system(root: Path) -> list[dict]:
 def discover_test_structure(root: Path) -> dict:
     """Detect test structure."""
     test_dirs = []
-    test_files_count = 0
-    test_patterns = ["test_*.py", "*_test.py", "*.test.js", "*.test.ts",
-                     "*.spec.js", "*.spec.ts", "*_test.go", "*Test.java"]
+    top = _scan_dir(root)
 
     # Test directories
-    for name in ["tests", "test", "spec", "__tests__", "test_*"]:
-        for d in root.glob(name):
-            if d.is_dir():
-                test_dirs.append(str(d.relative_to(root)))
+    for name in ["tests", "test", "spec", "__tests__"]:
+        if _is_dir_in(top, root, name):
+            test_dirs.append(name)
+    for name in fnmatch.filter(top, "test_*"):
+        if top[name].is_dir():
+            test_dirs.append(name)
 
     # Test file count
-    ignore_dirs = {".git", "node_modules", "__pycache__", ".venv", "venv", ".terraform"}
-    for pattern in test_patterns:
-        for f in root.rglob(pattern):
-            if any(part in ignore_dirs for part in f.parts):
-                continue
-            test_files_count += 1
+    test_files_count = sum(
+        1
+        for _, filenames in _walk_files(root)
+        for filename in filenames
+        if _TEST_FILE_RE.fullmatch(filename)
+    )
 
     # Test configuration files
     test_configs = []
@@ -269,7 +344,7 @@ def discover_test_structure(root: Path) -> dict:
         ".mocharc.yml", ".mocharc.json",  # mocha
     ]
     for name in config_files:
-        if (root / name).is_file():
+        if _is_file_in(top, root, name):
             test_configs.append(name)
 
     return {
@@ -287,11 +362,14 @@ def discover_claude_config(root: Path) -> dict:
 
     if claude_md.is_file():
         try:
-            text = claude_md.read_text(encoding="utf-8")
-            claude_md_content = text[:3000]  # Preview only
-            # Detect language tag
-            import re
-            match = re.search(r"<language>(.*?)</language>", text)
+            with claude_md.open(encoding="utf-8") as f:
+                text = f.read(CLAUDE_MD_PREVIEW_CHARS)  # Preview only
+                # Detect language tag; read the rest only if it is not in the head
+                match = _LANGUAGE_TAG_RE.search(text)
+                if match is None:
+                    text += f.read()
+                    match = _LANGUAGE_TAG_RE.search(text)
+            claude_md_content = text[:CLAUDE_MD_PREVIEW_CHARS]
             if match:
                 language = match.group(1)
         except (UnicodeDecodeError, OSError):
@@ -302,8 +380,7 @@ def discover_claude_config(root: Path) -> dict:
     if language is None and global_claude_md.is_file():
         try:
             text = global_claude_md.read_text(encoding="utf-8")
-            import re
-            match = re.search(r"<language>(.*?)</language>", text)
+            match = _LANGUAGE_TAG_RE.search(text)
             if match:
                 language = match.group(1)
         except (UnicodeDecodeError, OSError):
@@ -312,10 +389,9 @@ def discover_claude_config(root: Path) -> dict:
     # Existing skills
     skills_dir = root / ".claude" / "skills"
     existing_skills = []
-    if skills_dir.is_dir():
-        for d in sorted(skills_dir.iterdir()):
-            if d.is_dir() and (d / "SKILL.md").is_file():
-                existing_skills.append(d.name)
+    for name, entry in sorted(_scan_dir(skills_dir).items()):
+        if entry.is_dir() and (skills_dir / name / "SKILL.md").is_file():
+            existing_skills.append(name)
 
     return {
         "has_claude_md": claude_md.is_file(),
@@ -346,7 +422,9 @@ def main() -> None:
         "claude_config": discover_claude_config(root),
     }
 
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    # Serialize straight to stdout rather than building the whole string first
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
 
 
 if __name__ == "__main__":